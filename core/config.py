@@ -1,8 +1,14 @@
+import functools
 from dataclasses import dataclass
 from typing import Optional, Type
 
 import yaml
 
+try:
+    from yaml import CSafeDumper as SafeDumper, CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeDumper, SafeLoader
+
 
 @dataclass
 class ConfigAttr:
@@ -19,8 +25,7 @@ class ConfigAttr:
 class Config:
     def __init__(self, config_path: str):
         self.config_path = config_path
-        with open(config_path) as fh:
-            self.data: dict = yaml.safe_load(fh)
+        self.data: dict = _load_config(config_path)
 
     @property
     def executables(self) -> dict[str, str]:
@@ -41,3 +46,9 @@ class Config:
     @property
     def handbrake_cli(self) -> str:
         return self.executables["handbrake_cli"]
+
+
+@functools.cache
+def _load_config(config_path: str) -> dict:
+    with open(config_path) as fh:
+        return yaml.load(fh, Loader=SafeLoader)
@@ -1,13 +1,63 @@
 import argparse
+import importlib
 import os
+from typing import Type
 
-from smart_splitter.smart_splitter import SmartSplitter
+from core.tool import Tool
 from core.utils import initialize_logger, log_exception
-from stream_pruner.stream_pruner import StreamPruner
+
+TOOLS = {
+    "split": ("smart_splitter.smart_splitter", "SmartSplitter"),
+    "prune": ("stream_pruner.stream_pruner", "StreamPruner"),
+}
+
+
+def get_tool(name: str) -> Type[Tool]:
+    if name not in TOOLS:
+        raise ValueError(f"invalid tool: {name}")
+    module_name, class_name = TOOLS[name]
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+class ArgumentParser(argparse.ArgumentParser):
+    # python 3.14+ builds a new (color probing) formatter for every add_argument
+    # validation, so reuse one while arguments are being added. help output still
+    # gets a fresh formatter since those accumulate sections.
+    def __init__(self, *args, **kwargs):
+        self._adding_argument = False
+        self._validation_formatter = None
+        super().__init__(*args, **kwargs)
+
+    def add_argument(self, *args, **kwargs):
+        self._adding_argument = True
+        try:
+            return super().add_argument(*args, **kwargs)
+        finally:
+            self._adding_argument = False
+
+    def _get_formatter(self):
+        if not self._adding_argument:
+            return super()._get_formatter()
+        if self._validation_formatter is None:
+            self._validation_formatter = super()._get_formatter()
+        return self._validation_formatter
+
+
+class ToolParser(ArgumentParser):
+    def __init__(self, *args, tool_name: str, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.tool_name = tool_name
+        self.tool_loaded = False
+
+    def parse_known_args(self, args=None, namespace=None):
+        if not self.tool_loaded:
+            get_tool(self.tool_name).add_arguments(self)
+            self.tool_loaded = True
+        return super().parse_known_args(args, namespace)
 
 
 def create_parser() -> argparse.ArgumentParser:
-    parser = argparse.ArgumentParser(
+    parser = ArgumentParser(
         description="a collection to tools to handle media", allow_abbrev=False
     )
     parser.add_argument("--config", "-c", required=True, help="path to config file")
@@ -24,9 +74,11 @@ def create_parser() -> argparse.ArgumentParser:
         action="store_true",
         help="if passed, detect the mimetype from the file instead of the extension",
     )
-    subparsers = parser.add_subparsers(help="commands", dest="tool", required=True)
-    for tool in [SmartSplitter, StreamPruner]:
-        tool.create_parser(subparsers)
+    subparsers = parser.add_subparsers(
+        help="commands", dest="tool", required=True, parser_class=ToolParser
+    )
+    for tool_name in TOOLS:
+        subparsers.add_parser(tool_name, tool_name=tool_name)
     return parser
 
 
@@ -36,12 +88,7 @@ def run(args_without_script: list[str]):
     debug_file_path = os.path.join(os.getcwd(), f"media_tools-{parsed_args.tool}.log")
     initialize_logger(debug_file_path, parsed_args.debug)
     try:
-        if parsed_args.tool == "split":
-            tool = SmartSplitter(parsed_args)
-        elif parsed_args.tool == "prune":
-            tool = StreamPruner(parsed_args)
-        else:
-            raise ValueError(f"invalid tool: {parsed_args.tool}")
+        tool = get_tool(parsed_args.tool)(parsed_args)
         tool.run()
     except FileNotFoundError as exc:
         log_exception(exc, debug_file_path, f"File not found: {exc}")
@@ -1,9 +1,11 @@
+import argparse
 import logging
 import os
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Optional
 
-from core.utils import mimetype, is_video_mimetype, is_video_file
+from core.utils import is_video_content, is_video_ext, is_video_file
 
 
 class Tool(ABC):
@@ -19,7 +21,7 @@ class Tool(ABC):
 
     @staticmethod
     @abstractmethod
-    def create_parser(subparsers):
+    def add_arguments(parser: argparse.ArgumentParser):
         raise NotImplementedError
 
     def build_media_files(
@@ -39,26 +41,37 @@ class Tool(ABC):
         self, recursive: bool = False, ignore_dirs: Optional[List[str]] = None
     ) -> list[str]:
         logging.debug(f"finding media files in {self.input}")
-        media_files = []
-        for root_dir, dirs, files in os.walk(self.input):
-            if ignore_dirs and root_dir in ignore_dirs:
+        file_paths = []
+        ignore = set(map(os.path.normpath, ignore_dirs or ()))
+        dir_stack = [os.path.normpath(self.input)]
+        while dir_stack:
+            root_dir = dir_stack.pop()
+            if root_dir in ignore:
                 continue
-            for file in files:
-                file_path = os.path.join(root_dir, file)
-                file_mimetype = mimetype(file_path, self.strict_mimetype)
-                if not is_video_mimetype(file_mimetype):
-                    logging.debug(
-                        f"skipping non-video file: {file_path} [{file_mimetype}]"
-                    )
-                    continue
+            sub_dirs = []
+            with os.scandir(root_dir) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=True):
+                        if recursive and not entry.is_symlink():
+                            sub_dirs.append(entry.path)
+                    else:
+                        file_paths.append(entry.path)
+            dir_stack.extend(reversed(sub_dirs))
+        if self.strict_mimetype:
+            max_workers = min(32, (os.cpu_count() or 1) * 4)
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                video_flags = list(executor.map(is_video_content, file_paths))
+        else:
+            video_flags = [is_video_ext(file_path) for file_path in file_paths]
+        media_files = []
+        skipped_files = []
+        for file_path, is_video in zip(file_paths, video_flags):
+            if is_video:
                 media_files.append(file_path)
-            if not recursive:
-                break
-            i = 0
-            while i < len(dirs):
-                sub_dir = os.path.join(root_dir, dirs[i])
-                if sub_dir in ignore_dirs:
-                    del dirs[i]
-                else:
-                    i += 1
+            else:
+                skipped_files.append(file_path)
+        if skipped_files:
+            logging.debug(
+                f"skipped {len(skipped_files)} non-video files: {skipped_files[:10]}"
+            )
         return media_files
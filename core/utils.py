@@ -1,12 +1,15 @@
-import json
+import copy
+import functools
 import logging
 import mimetypes
 import os
+import queue
 import subprocess
 import sys
-import time
+import threading
 from decimal import Decimal
-from typing import Optional, Callable, Union
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional, Callable, Union, Iterator, BinaryIO
 
 import asyncio
 import magic
@@ -14,21 +17,79 @@ from subprocess import CompletedProcess, CalledProcessError
 
 from tqdm import tqdm
 
+try:
+    import orjson as json
+except ImportError:
+    import json
+
+_logger_initialized = False
+
+LOG_FORMATTER = logging.Formatter("%(asctime)s | %(levelname)s - %(message)s")
+logging.logThreads = False
+logging.logProcesses = False
+logging.logMultiprocessing = False
+
 
 def initialize_logger(debug_file_path: str, debug_mode: bool = False):
-    logger = logging.getLogger()
-    if logger.hasHandlers():
+    global _logger_initialized
+    if _logger_initialized:
         logging.debug(f"logger has already been initialized")
         return
+    _logger_initialized = True
+    logger = logging.getLogger()
     logger.setLevel(logging.DEBUG)
     sh = logging.StreamHandler(sys.stdout)
     if not debug_mode:
         sh.addFilter(lambda record: 0 if record.exc_info else 1)
     init_logging_handler(sh, logging.INFO)
-    logger.addHandler(sh)
-    fh = logging.FileHandler(filename=debug_file_path, mode="w", encoding="utf-8")
+    fh = logging.FileHandler(
+        filename=debug_file_path, mode="w", encoding="utf-8", delay=True
+    )
     init_logging_handler(fh)
-    logger.addHandler(fh)
+    logger.addHandler(BackgroundHandler(sh, fh))
+
+
+class BackgroundHandler(QueueHandler):
+    def __init__(self, *handlers: logging.Handler):
+        super().__init__(queue.SimpleQueue())
+        self.listener = QueueListener(self.queue, *handlers, respect_handler_level=True)
+        self.listener.start()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def close(self):
+        if self.listener:
+            self.listener.stop()
+            for handler in self.listener.handlers:
+                handler.close()
+            self.listener = None
+        super().close()
+
+
+class ProcessQueueHandler(BackgroundHandler):
+    def __init__(self, log_queue):
+        QueueHandler.__init__(self, log_queue)
+        self.listener = None
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = super().prepare(record)
+        if record.exc_info:
+            record.exc_text = LOG_FORMATTER.formatException(record.exc_info)
+            # tracebacks can't be pickled, a truthy exc_info still hides it on console
+            record.exc_info = (None, None, None)
+        return record
+
+
+def initialize_worker_logger(log_queue):
+    global _logger_initialized
+    _logger_initialized = True
+    logger = logging.getLogger()
+    logger.setLevel(logging.DEBUG)
+    logger.addHandler(ProcessQueueHandler(log_queue))
 
 
 def log_exception(e: Exception, log_file_path: str, msg: str = ""):
@@ -41,23 +102,27 @@ def log_exception(e: Exception, log_file_path: str, msg: str = ""):
 
 def init_logging_handler(handler: logging.Handler, level=logging.DEBUG):
     handler.setLevel(level)
-    formatter = logging.Formatter("%(asctime)s | %(levelname)s - %(message)s")
-    handler.setFormatter(formatter)
+    handler.setFormatter(LOG_FORMATTER)
 
 
 def format_timestamp(timestamp: Decimal) -> str:
-    timestamp_parts = str(timestamp).split(".")
-    seconds = timestamp_parts[0]
-    fractional = timestamp_parts[1] if len(timestamp_parts) == 2 else ""
-    partial_time = time.strftime("%H:%M:%S", time.gmtime(int(seconds)))
-    return f"{partial_time}.{fractional:0<6}"
+    sign = "-" if timestamp < 0 else ""
+    seconds, fractional = divmod(abs(timestamp), 1)
+    fractional = format(fractional, "f").partition(".")[2]
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{sign}{hours:02}:{minutes:02}:{seconds:02}.{fractional:0<6}"
 
 
 def parse_timestamp(timestamp: str) -> Decimal:
-    hms, fractional = timestamp.split(".")
+    hms, _, fractional = timestamp.partition(".")
     h, m, s = hms.split(":")
     seconds = (int(h) * 3600) + (int(m) * 60) + int(s)
-    return Decimal(f"{seconds}.{fractional}")
+    return Decimal(f"{seconds}.{fractional or 0}")
+
+
+def timestamp_ns(timestamp: Decimal) -> int:
+    return round(timestamp * 1_000_000_000)
 
 
 def parse_duration(duration_str: str) -> Decimal:
@@ -66,25 +131,52 @@ def parse_duration(duration_str: str) -> Decimal:
     return Decimal(duration_str)
 
 
-def fps_adjusted_frame(secs: Decimal, fps: Decimal) -> int:
-    return round(fps * secs)
+def fps_adjusted_frame(secs: Decimal, fps: float) -> int:
+    return round(float(secs) * fps)
 
 
 def log_multiline(level, header, message):
-    logging.log(level, f"{header}\n{message}")
+    logging.log(level, "%s\n%s", header, message)
+
+
+_magic_local = threading.local()
 
 
 def mimetype(path: str, strict: bool = False) -> Optional[str]:
     if os.path.isdir(path):
         return "directory"
-    path_mimetype = (
-        magic.from_file(path, mime=True) if strict else mimetypes.guess_type(path)[0]
-    )
-    return path_mimetype
+    return mimetype_by_content(path) if strict else mimetype_by_ext(path)
+
+
+def mimetype_by_ext(path: str) -> Optional[str]:
+    return _guess_by_ext(os.path.splitext(path)[1].lower())
+
+
+def mimetype_by_content(path: str) -> Optional[str]:
+    return _magic().from_file(path)
+
+
+def _magic() -> magic.Magic:
+    if not hasattr(_magic_local, "magic"):
+        _magic_local.magic = magic.Magic(mime=True)
+    return _magic_local.magic
+
+
+@functools.lru_cache(maxsize=4096)
+def _guess_by_ext(ext: str) -> Optional[str]:
+    return mimetypes.guess_type(f"x{ext}")[0]
 
 
 def is_video_mimetype(path_mimetype: Optional[str]) -> bool:
-    return path_mimetype and path_mimetype.split("/")[0] == "video"
+    return bool(path_mimetype) and path_mimetype.startswith("video/")
+
+
+def is_video_content(path: str) -> bool:
+    return is_video_mimetype(mimetype_by_content(path))
+
+
+def is_video_ext(path: str) -> bool:
+    return is_video_mimetype(mimetype_by_ext(path))
 
 
 def is_video_file(path: str, strict: bool = False) -> bool:
@@ -100,33 +192,55 @@ def validate_paths(*paths: str):
 
 
 ENC_START = b"Encoding: task 1 of 1, "
+ENC_WINDOW = 256
 OutputHandler = Callable[[bytes], None]
+PIPE_BUFFER_SIZE = 2**20
+CLOSE_FDS = os.name == "nt"
 
 
-def monitor_handbrake_encode(buffer: bytes, progress_bar: tqdm, data: dict[str, bytes]):
-    current_line = data["current_line"] + buffer
-    if (perc_index := current_line.find(b"%")) != -1 and (
+def monitor_handbrake_encode(
+    buffer: bytes, progress_bar: tqdm, data: dict[str, bytearray]
+):
+    current_line = data["current_line"]
+    current_line += buffer
+    if (perc_index := current_line.rfind(b"%")) != -1 and (
         enc_start := current_line.rfind(ENC_START, 0, perc_index)
     ) != -1:
         perc = current_line[enc_start + len(ENC_START) : perc_index]
-        current_line = current_line[perc_index + 1 :]
+        del current_line[: perc_index + 1]
         if perc:
             try:
                 progress_bar.update(float(perc) - progress_bar.n)
             except ValueError:
                 pass
-    data["current_line"] = current_line
+    del current_line[:-ENC_WINDOW]
+
+
+def chain_handlers(*handlers: Optional[OutputHandler]) -> Optional[OutputHandler]:
+    handlers = [handler for handler in handlers if handler]
+    if len(handlers) <= 1:
+        return handlers[0] if handlers else None
+
+    def chained_handler(buffer: bytes):
+        for handler in handlers:
+            handler(buffer)
+
+    return chained_handler
 
 
 async def capture_output(
-    stream: asyncio.StreamReader, handlers: list[OutputHandler]
+    stream: asyncio.StreamReader,
+    handler: Optional[OutputHandler] = None,
+    discard: bool = False,
 ) -> bytes:
-    output = []
-    while buffer := await stream.read(2 ** 16):
-        output.append(buffer)
-        for handler in handlers:
+    output = bytearray()
+    read = stream.read
+    while buffer := await read(PIPE_BUFFER_SIZE):
+        if not discard:
+            output += buffer
+        if handler:
             handler(buffer)
-    return b"".join(output)
+    return bytes(output)
 
 
 def normalize_newlines(data: Union[bytes, str]) -> str:
@@ -143,27 +257,30 @@ async def async_run_process(
     text: bool = False,
     print_stdout: bool = False,
     print_stderr: bool = False,
+    discard_stdout: bool = False,
 ) -> CompletedProcess:
     process = await asyncio.create_subprocess_exec(
-        *args, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+        *args,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        limit=PIPE_BUFFER_SIZE,
+        close_fds=CLOSE_FDS,
     )
     try:
-        stdout_handlers = [
-            handler
-            for handler in [print_stdout and sys.stdout.buffer.write, stdout_handler]
-            if handler
-        ]
-        stderr_handlers = [
-            handler
-            for handler in [print_stderr and sys.stderr.buffer.write, stderr_handler]
-            if handler
-        ]
-        if stdout_handlers:
-            stdout_coroutine = capture_output(process.stdout, stdout_handlers)
+        stdout_handler = chain_handlers(
+            print_stdout and sys.stdout.buffer.write, stdout_handler
+        )
+        stderr_handler = chain_handlers(
+            print_stderr and sys.stderr.buffer.write, stderr_handler
+        )
+        if stdout_handler or discard_stdout:
+            stdout_coroutine = capture_output(
+                process.stdout, stdout_handler, discard_stdout
+            )
         else:
             stdout_coroutine = process.stdout.read()
-        if stderr_handlers:
-            stderr_coroutine = capture_output(process.stderr, stderr_handlers)
+        if stderr_handler:
+            stderr_coroutine = capture_output(process.stderr, stderr_handler)
         else:
             stderr_coroutine = process.stderr.read()
         stdout, stderr = await asyncio.gather(stdout_coroutine, stderr_coroutine)
@@ -175,8 +292,9 @@ async def async_run_process(
             raise CalledProcessError(process.returncode, args, stdout, stderr)
         logging.debug(normalize_newlines(stdout))
         return CompletedProcess(args, process.returncode, stdout, stderr)
-    except Exception:
-        process.kill()
+    except BaseException:
+        if process.returncode is None:
+            process.kill()
         raise
 
 
@@ -184,20 +302,80 @@ def run_process(args: list[str]) -> str:
     try:
         command = " ".join(args)
         logging.debug(f"\n+ BEGIN calling {command}")
-        cp = asyncio.run(async_run_process(args, check=True, text=True))
+        cp = subprocess.run(args, check=True, capture_output=True, close_fds=CLOSE_FDS)
+        stdout = normalize_newlines(cp.stdout)
+        logging.debug(stdout)
         logging.debug(f"\n+ END calling {command}")
-        return cp.stdout
+        return stdout
     except subprocess.CalledProcessError as e:
         msg = [
             "Error calling process:",
             f"return_code: {e.returncode}",
-            f"stdout:\n{e.stdout}",
-            f"stderr:\n{e.stderr}",
+            f"stdout:\n{normalize_newlines(e.stdout)}",
+            f"stderr:\n{normalize_newlines(e.stderr)}",
         ]
         logging.error("\n".join(msg))
         raise
 
 
+def iter_line_chunks(fh: BinaryIO, chunk_size: int = PIPE_BUFFER_SIZE) -> Iterator[str]:
+    remainder = b""
+    while chunk := fh.read1(chunk_size):
+        chunk = remainder + chunk
+        line_end = chunk.rfind(b"\n") + 1
+        remainder = chunk[line_end:]
+        if line_end:
+            yield normalize_newlines(chunk[:line_end])
+    if remainder:
+        yield normalize_newlines(remainder)
+
+
+def stream_process(
+    args: list[str], cancel: Optional[threading.Event] = None
+) -> Iterator[str]:
+    command = " ".join(args)
+    logging.debug(f"\n+ BEGIN streaming {command}")
+    stderr = []
+    with subprocess.Popen(
+        args,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        bufsize=PIPE_BUFFER_SIZE,
+        close_fds=CLOSE_FDS,
+    ) as process:
+        stderr_thread = threading.Thread(
+            target=lambda: stderr.append(process.stderr.read()), daemon=True
+        )
+        stderr_thread.start()
+        if cancel is not None:
+            threading.Thread(
+                target=_kill_on_cancel, args=(process, cancel), daemon=True
+            ).start()
+        try:
+            yield from iter_line_chunks(process.stdout)
+        except BaseException:
+            process.kill()
+            raise
+        finally:
+            stderr_thread.join()
+    if process.returncode:
+        stderr_text = normalize_newlines(b"".join(stderr))
+        if not (cancel and cancel.is_set()):
+            msg = [
+                "Error calling process:",
+                f"return_code: {process.returncode}",
+                f"stderr:\n{stderr_text}",
+            ]
+            logging.error("\n".join(msg))
+        raise CalledProcessError(process.returncode, args, None, stderr_text)
+    logging.debug(f"\n+ END streaming {command}")
+
+
+def _kill_on_cancel(process: subprocess.Popen, cancel: threading.Event):
+    cancel.wait()
+    process.kill()
+
+
 def log_file_header(header: str, level=logging.INFO):
     basename = os.path.basename(header)
     line = "*" * (len(basename) + 4)
@@ -18,6 +18,8 @@ class SmartSplitterConfig(Config):
         self.output_directory: Optional[str] = None
         self.input_pattern: Optional[Pattern] = None
         self.dry_run: bool = False
+        self.parallel_files: int = 1
+        self.parallel_encodes: int = 1
         self.attrs: dict[str, ConfigAttr] = SmartSplitterConfig._create_config_entries()
         self._load_from_config()
 
@@ -32,6 +34,8 @@ class SmartSplitterConfig(Config):
             ConfigAttr("output_directory"),
             ConfigAttr("input_pattern", type=Pattern),
             ConfigAttr("dry_run", type=bool),
+            ConfigAttr("parallel_files", type=int),
+            ConfigAttr("parallel_encodes", type=int),
         ]
         return {attr.name: attr for attr in attrs}
 
@@ -1,16 +1,28 @@
 import asyncio
-import json
+import hashlib
+import heapq
 import logging
 import os
+import pickle
 import re
+import threading
+from collections import deque
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from decimal import Decimal
-from functools import partial
+from functools import cached_property, partial
 from subprocess import CompletedProcess
-from typing import Any, Optional
+from typing import Any, Callable, Optional, Iterator
 
 from tqdm import tqdm
 import yaml
 
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from core.config import SafeDumper
 from smart_splitter.config import SmartSplitterConfig
 from smart_splitter.models import (
     FrameInfo,
@@ -21,320 +33,450 @@ from smart_splitter.models import (
     Clip,
 )
 from core.utils import (
+    BackgroundHandler,
     init_logging_handler,
     log_multiline,
     format_timestamp,
     run_process,
+    stream_process,
+    iter_line_chunks,
+    PIPE_BUFFER_SIZE,
     async_run_process,
     monitor_handbrake_encode,
     parse_duration,
+    json,
 )
 
 
 class Media:
-    FFMPEG_FRAME_LINE = r"frame:(\d+)\s+pts:(\d+)\s+pts_time:(-?\d+\.?\d*)"
-    FFMPEG_KEY_LINE = r"(?:([^.]+?)\.)?(.+?)(?:_([^_]+?))?=(.+)"
+    FFMPEG_LINE = re.compile(
+        r"^[ \t]*(?P<line>"
+        r"frame:(?P<frame>\d+)[ \t]+pts:(?P<pts>\d+)[ \t]+pts_time:(?P<pts_time>-?\d+\.?\d*).*?"
+        r"|(?P<key>[^=\n]+)=(?P<value>.+?)"
+        r"|(?P<invalid>.+?)"
+        r")[ \t\r]*$",
+        re.MULTILINE,
+    )
+    SOURCE_KEY_BLOCK_SIZE = 2**20
+    DURATION_TAGS = ("DURATION", "DURATION-eng", "duration")
+    # bump whenever the pickled models change shape
+    PICKLE_VERSION = 1
 
     def __init__(self, path: str, output_folder: str, config: SmartSplitterConfig):
         self.path: str = os.path.abspath(path)
         self.output_folder: str = output_folder
         self.config: SmartSplitterConfig = config
-        self.cache: dict[str, Any] = {}
         self.extension: str = os.path.splitext(path)[1]
         self.init_logger()
         self.log_basic_info()
 
     def log_basic_info(self):
         for stream_type in ["video", "audio"]:
-            logging.debug(
-                f"{stream_type} frame count: {self.stream_frame_count(stream_type)}"
-            )
-            logging.debug(
-                f"{stream_type} duration: {self.stream_duration(stream_type)}"
-            )
-            logging.debug(f"{stream_type} fps: {self.stream_fps(stream_type)}")
+            frame_count = getattr(self, f"{stream_type}_frame_count")
+            duration = getattr(self, f"{stream_type}_duration")
+            fps = getattr(self, f"{stream_type}_fps")
+            logging.debug(f"{stream_type} frame count: {frame_count}")
+            logging.debug(f"{stream_type} duration: {duration}")
+            logging.debug(f"{stream_type} fps: {fps}")
 
     def init_logger(self):
         log_file = os.path.join(self.output_folder, "output.log")
         fh = logging.FileHandler(log_file, mode="w")
         init_logging_handler(fh)
-        logging.getLogger().addHandler(fh)
+        logging.getLogger().addHandler(BackgroundHandler(fh))
 
-    @property
+    @cached_property
     def cache_directory(self) -> str:
         cache_dir = os.path.join(self.output_folder, "cache")
         os.makedirs(cache_dir, exist_ok=True)
+        prefix = f"{self.source_key}."
+        with os.scandir(cache_dir) as it:
+            for entry in it:
+                if entry.is_file() and not entry.name.startswith(prefix):
+                    logging.debug(f"removing stale cache file: {entry.path}")
+                    os.remove(entry.path)
         return cache_dir
 
+    @cached_property
+    def source_key(self) -> str:
+        block_size = Media.SOURCE_KEY_BLOCK_SIZE
+        stat = os.stat(self.path)
+        size = stat.st_size
+        digest = hashlib.blake2b(f"{size}.{stat.st_mtime_ns}".encode(), digest_size=8)
+        with open(self.path, mode="rb") as fh:
+            digest.update(fh.read(block_size))
+            if size > block_size:
+                fh.seek(max(block_size, size - block_size))
+                digest.update(fh.read(block_size))
+        return digest.hexdigest()
+
+    def cache_file(self, cache_key: str, extension: str) -> str:
+        return os.path.join(
+            self.cache_directory, f"{self.source_key}.{cache_key}.{extension}"
+        )
+
     def run_process(self, args: list[str], cache_key: Optional[str] = None) -> str:
-        command = " ".join(args)
-        logging.debug(f"running {command}")
-        stdout = None
-        cache_file = os.path.join(self.cache_directory, f"{cache_key}.txt")
         if cache_key:
-            if os.path.exists(cache_file):
-                logging.debug(f"reading from cached output: {cache_file}")
-                with open(cache_file) as fh:
-                    stdout = fh.read()
-                if not stdout:
-                    logging.warning(f"cache file found, but no output found!")
-            else:
-                logging.debug("cache file not found")
-        if not stdout:
-            if cache_key:
-                logging.info(f"\nBuilding cached output: {command}")
+            stdout = "".join(self.stream_process(args, cache_key))
+        else:
+            logging.debug(f"running {' '.join(args)}")
             stdout = run_process(args)
-            if cache_key:
-                with open(cache_file, mode="w") as fh:
-                    fh.write(stdout)
         log_multiline(logging.DEBUG, "process stdout:", stdout)
         return stdout
 
-    @property
+    def output_cache_file(self, cache_key: str) -> str:
+        return self.cache_file(cache_key, "txt.zst" if zstandard else "txt")
+
+    def is_pickle_current(self, pickle_file: str, output_keys: list[str]) -> bool:
+        if not os.path.exists(pickle_file):
+            return False
+        pickle_mtime = os.path.getmtime(pickle_file)
+        for output_key in output_keys:
+            output_file = self.output_cache_file(output_key)
+            if not os.path.exists(output_file):
+                logging.debug(f"cached output missing, rebuilding: {output_file}")
+                return False
+            if os.path.getmtime(output_file) > pickle_mtime:
+                logging.debug(f"cached output is newer, rebuilding: {output_file}")
+                return False
+        return True
+
+    def pickled(
+        self, cache_key: str, parse: Callable[[], Any], output_keys: list[str]
+    ) -> Any:
+        pickle_file = self.cache_file(cache_key, f"v{Media.PICKLE_VERSION}.pickle")
+        if self.is_pickle_current(pickle_file, output_keys):
+            logging.debug(f"reading from pickled output: {pickle_file}")
+            try:
+                with open(pickle_file, mode="rb") as fh:
+                    return pickle.load(fh)
+            except Exception as exc:
+                logging.warning(f"unable to load pickled output, rebuilding: {exc}")
+        value = parse()
+        incomplete_pickle_file = f"{pickle_file}.incomplete"
+        with open(incomplete_pickle_file, mode="wb") as fh:
+            pickle.dump(value, fh, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(incomplete_pickle_file, pickle_file)
+        return value
+
+    def stream_process(
+        self, args: list[str], cache_key: str, cancel: Optional[threading.Event] = None
+    ) -> Iterator[str]:
+        command = " ".join(args)
+        logging.debug(f"running {command}")
+        cache_file = self.output_cache_file(cache_key)
+        if os.path.exists(cache_file):
+            if os.path.getsize(cache_file):
+                logging.debug(f"reading from cached output: {cache_file}")
+                with open(cache_file, mode="rb", buffering=PIPE_BUFFER_SIZE) as fh:
+                    if zstandard:
+                        fh = zstandard.ZstdDecompressor().stream_reader(fh)
+                    yield from iter_line_chunks(fh)
+                return
+            logging.warning(f"cache file found, but no output found!")
+        else:
+            logging.debug("cache file not found")
+        logging.info(f"\nBuilding cached output: {command}")
+        incomplete_cache_file = f"{cache_file}.incomplete"
+        has_output = False
+        try:
+            with open(
+                incomplete_cache_file, mode="wb", buffering=PIPE_BUFFER_SIZE
+            ) as fh:
+                writer = (
+                    zstandard.ZstdCompressor().stream_writer(fh) if zstandard else fh
+                )
+                for chunk in stream_process(args, cancel):
+                    has_output = True
+                    writer.write(chunk.encode())
+                    yield chunk
+                if zstandard:
+                    writer.flush(zstandard.FLUSH_FRAME)
+        except BaseException:
+            os.remove(incomplete_cache_file)
+            raise
+        if not has_output:
+            logging.warning(f"no output found, not caching: {command}")
+            os.remove(incomplete_cache_file)
+            return
+        os.replace(incomplete_cache_file, cache_file)
+
+    @cached_property
     def info_json(self) -> dict:
-        cache_key = "info_json"
-        if cache_key not in self.cache:
-            args = [
-                self.config.ffprobe,
-                "-of",
-                "json",
-                "-hide_banner",
-                "-v",
-                "error",
-                "-show_streams",
-                "-count_packets",
-                self.path,
-            ]
-            stdout = self.run_process(args, cache_key)
-            self.cache[cache_key] = json.loads(stdout)
-        return self.cache[cache_key]
+        return self.pickled("info_json", self.parse_info_json, ["info_json"])
+
+    def parse_info_json(self) -> dict:
+        args = [
+            self.config.ffprobe,
+            "-of",
+            "json",
+            "-hide_banner",
+            "-v",
+            "error",
+            "-show_entries",
+            "stream=codec_type,duration,nb_read_packets:stream_tags",
+            "-count_packets",
+            self.path,
+        ]
+        return json.loads(self.run_process(args, "info_json"))
+
+    @cached_property
+    def streams_by_type(self) -> dict[str, list[dict]]:
+        streams_by_type: dict[str, list[dict]] = {}
+        for stream in self.info_json["streams"]:
+            streams_by_type.setdefault(stream["codec_type"], []).append(stream)
+        return streams_by_type
 
     def parse_streams(self, stream_type: str) -> list[dict]:
-        streams = []
-        for stream in self.info_json["streams"]:
-            if stream["codec_type"] == stream_type:
-                streams.append(stream)
-        return streams
+        return self.streams_by_type.get(stream_type, [])
 
     @property
     def video_streams(self) -> list[dict]:
-        cache_key = "video_streams"
-        if cache_key not in self.cache:
-            self.cache[cache_key] = self.parse_streams("video")
-        return self.cache[cache_key]
+        return self.parse_streams("video")
 
     @property
     def audio_streams(self) -> list[dict]:
-        cache_key = "audio_streams"
-        if cache_key not in self.cache:
-            self.cache[cache_key] = self.parse_streams("audio")
-        return self.cache[cache_key]
+        return self.parse_streams("audio")
 
     def stream_duration(self, stream_type: str) -> Decimal:
-        stream_info: dict[str, Any] = getattr(self, f"{stream_type}_streams")[0]
+        stream_info: dict[str, Any] = self.parse_streams(stream_type)[0]
         tags: dict[str, Any] = stream_info["tags"]
-        for k, v in tags.items():
-            if "duration" in k.lower():
-                return parse_duration(v)
+        duration_key = next(
+            (k for k in tags if k in Media.DURATION_TAGS or "duration" in k.lower()),
+            None,
+        )
+        if duration_key is not None:
+            return parse_duration(tags[duration_key])
         if "duration" in stream_info:
             return parse_duration(stream_info["duration"])
         raise ValueError("no duration tag found!!")
 
     def stream_frame_count(self, stream_type: str) -> int:
-        frame_count = getattr(self, f"{stream_type}_streams")[0]["nb_read_packets"]
+        frame_count = self.parse_streams(stream_type)[0]["nb_read_packets"]
         return int(frame_count)
 
-    def stream_fps(self, stream_type: str) -> Decimal:
-        fps = self.stream_frame_count(stream_type) / self.stream_duration(stream_type)
-        return fps
+    def stream_fps(self, stream_type: str) -> float:
+        frame_count = getattr(self, f"{stream_type}_frame_count")
+        duration = getattr(self, f"{stream_type}_duration")
+        return frame_count / float(duration)
 
-    @property
+    @cached_property
     def video_duration(self) -> Decimal:
         return self.stream_duration("video")
 
-    @property
+    @cached_property
     def video_frame_count(self) -> int:
         return self.stream_frame_count("video")
 
-    @property
-    def video_fps(self) -> Decimal:
+    @cached_property
+    def video_fps(self) -> float:
         return self.stream_fps("video")
 
-    @property
+    @cached_property
     def audio_duration(self) -> Decimal:
         return self.stream_duration("audio")
 
-    @property
+    @cached_property
     def audio_frame_count(self) -> int:
         return self.stream_frame_count("audio")
 
-    @property
-    def audio_fps(self) -> Decimal:
+    @cached_property
+    def audio_fps(self) -> float:
         return self.stream_fps("audio")
 
-    @property
-    def ffmpeg_output(self) -> str:
-        cache_key = "ffmpeg_output"
-        if cache_key not in self.cache:
-            args = [
-                self.config.ffmpeg,
-                "-v",
-                "warning",
-                "-i",
-                self.path,
+    def ffmpeg_output(
+        self,
+        cache_key: str,
+        filter_args: list[str],
+        cancel: Optional[threading.Event] = None,
+    ) -> Iterator[str]:
+        concurrent_passes = 2 * self.config.parallel_files
+        filter_threads = max(1, (os.cpu_count() or 1) // concurrent_passes)
+        args = [
+            self.config.ffmpeg,
+            "-v",
+            "warning",
+            "-filter_threads",
+            str(filter_threads),
+            "-threads",
+            "0",
+            "-i",
+            self.path,
+            *filter_args,
+            "-sn",
+            "-f",
+            "null",
+            "-y",
+            "-",
+        ]
+        return self.stream_process(args, cache_key, cancel)
+
+    def silence_output(self, cancel: Optional[threading.Event] = None) -> Iterator[str]:
+        return self.ffmpeg_output(
+            "ffmpeg_silence",
+            [
+                "-vn",
                 "-af",
                 f"silencedetect={self.config.silencedetect_options},ametadata=mode=print:file=-",
+            ],
+        )
+
+    def black_output(self, cancel: Optional[threading.Event] = None) -> Iterator[str]:
+        return self.ffmpeg_output(
+            "ffmpeg_black",
+            [
+                "-an",
                 "-vf",
                 f"blackdetect={self.config.blackdetect_options},metadata=mode=print:file=-",
-                "-sn",
-                "-f",
-                "null",
-                "-y",
-                "-",
-            ]
-            stdout = self.run_process(args, cache_key)
-            self.cache[cache_key] = stdout
-        return self.cache[cache_key]
+            ],
+        )
 
-    @property
-    def frames(self) -> list[FrameInfo]:
-        cache_key = "frames"
-        if cache_key not in self.cache:
-            ffmpeg_lines = [line.strip() for line in self.ffmpeg_output.splitlines()]
-            frames: list[FrameInfo] = []
-            frame: Optional[FrameInfo] = None
-            for line in ffmpeg_lines:
-                if match := re.match(Media.FFMPEG_FRAME_LINE, line):
-                    logging.debug(f"ffmpeg frame line: {line}")
-                    if frame:
-                        frames.append(frame)
-                    frame = FrameInfo(line, *match.groups())
-                elif match := re.match(Media.FFMPEG_KEY_LINE, line):
-                    logging.debug(f"ffmpeg metadata line: {line}")
-                    if not frame:
-                        raise ValueError(f"frame metadata found, but no frame: {line}")
-                    metadata = FrameMetadata(line, *match.groups())
-                    if metadata.key in frame.metadata:
-                        raise ValueError(
-                            f"metadata already exists [{frame.raw}]: {line}"
-                        )
-                    frame.metadata[metadata.key] = metadata
-                else:
-                    raise ValueError(f"ffmpeg parsing error: {line}")
-            if frame:
-                frames.append(frame)
-            self.cache[cache_key] = frames
-        return self.cache[cache_key]
-
-    def detect_frames(self, cache_key: str, metadata_keys: list[str]):
-        if cache_key not in self.cache:
-            detect_frames = []
-            for frame in self.frames:
-                for key, metadata in frame.metadata.items():
-                    if key not in metadata_keys:
-                        continue
-                    detect_frame = DetectMetadata(frame, metadata)
-                    detect_frames.append(detect_frame)
-            self.cache[cache_key] = detect_frames
-        return self.cache[cache_key]
+    def parse_frames(self, name: str, output: Iterator[str]) -> list[FrameInfo]:
+        frames: list[FrameInfo] = []
+        frames_append = frames.append
+        frame: Optional[FrameInfo] = None
+        metadata_lines = 0
+        line_matches = (
+            match for chunk in output for match in Media.FFMPEG_LINE.finditer(chunk)
+        )
+        for match in line_matches:
+            line = match.group("line")
+            if match.group("invalid") is not None:
+                raise ValueError(f"ffmpeg parsing error: {line}")
+            if match.group("frame") is not None:
+                if frame:
+                    frames_append(frame)
+                frame = FrameInfo(line, *match.group("frame", "pts", "pts_time"))
+            else:
+                if not frame:
+                    raise ValueError(f"frame metadata found, but no frame: {line}")
+                metadata = FrameMetadata.from_key(line, *match.group("key", "value"))
+                if any(m.key == metadata.key for m in frame.metadata):
+                    raise ValueError(f"metadata already exists [{frame.raw}]: {line}")
+                frame.metadata.append(metadata)
+                metadata_lines += 1
+        if frame:
+            frames_append(frame)
+        logging.debug(
+            "ffmpeg %s output: parsed %d frame lines, %d metadata lines",
+            name,
+            len(frames),
+            metadata_lines,
+        )
+        return frames
 
-    @property
-    def black_frames(self) -> list[DetectMetadata]:
-        return self.detect_frames(
-            "black_frames", ["lavfi.black_start", "lavfi.black_end"]
+    @cached_property
+    def frames(self) -> list[FrameInfo]:
+        return self.pickled(
+            "frames", self.parse_all_frames, ["ffmpeg_silence", "ffmpeg_black"]
         )
 
-    @property
-    def silent_frames(self) -> list[DetectMetadata]:
-        return self.detect_frames(
-            "silent_frames", ["lavfi.silence_start", "lavfi.silence_end"]
+    def parse_all_frames(self) -> list[FrameInfo]:
+        cancel = threading.Event()
+
+        def parse(name: str, output: Iterator[str]) -> list[FrameInfo]:
+            with closing(output):
+                return self.parse_frames(name, output)
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            silence = executor.submit(parse, "silence", self.silence_output(cancel))
+            black = executor.submit(parse, "black", self.black_output(cancel))
+            try:
+                for future in as_completed([silence, black]):
+                    future.result()
+            finally:
+                # kills the other ffmpeg pass if one fails, instead of waiting on it
+                cancel.set()
+        return list(
+            heapq.merge(
+                silence.result(), black.result(), key=lambda frame: frame.pts_time
+            )
         )
 
-    def intervals(
-        self, cache_key: str, frames: list[DetectMetadata]
-    ) -> list[DetectInterval]:
-        if cache_key not in self.cache:
-            intervals = []
-            i = 0
-            while i + 1 < len(frames):
-                start_frame = frames[i]
-                end_frame = frames[i + 1]
-                if start_frame.sub_type != "start" or end_frame.sub_type != "end":
+    def intervals(self, metadata_keys: list[str]) -> list[DetectInterval]:
+        intervals = []
+        intervals_append = intervals.append
+        start_frame: Optional[DetectMetadata] = None
+        for frame in self.frames:
+            for metadata in frame.metadata:
+                if metadata.key not in metadata_keys:
+                    continue
+                detect_frame = DetectMetadata(frame, metadata)
+                if start_frame is None:
+                    start_frame = detect_frame
+                    continue
+                if start_frame.sub_type != "start" or detect_frame.sub_type != "end":
                     raise ValueError(
-                        f"expected start and end frames, got {start_frame} and {end_frame}"
+                        f"expected start and end frames, got {start_frame} and {detect_frame}"
                     )
-                interval = DetectInterval(start_frame, end_frame)
-                intervals.append(interval)
-                i += 2
-            self.cache[cache_key] = intervals
-        return self.cache[cache_key]
+                intervals_append(DetectInterval(start_frame, detect_frame))
+                start_frame = None
+        return intervals
 
-    @property
+    @cached_property
     def black_intervals(self) -> list[DetectInterval]:
-        return self.intervals("black_intervals", self.black_frames)
+        return self.intervals(["lavfi.black_start", "lavfi.black_end"])
 
-    @property
+    @cached_property
     def silent_intervals(self) -> list[DetectInterval]:
-        return self.intervals("silent_intervals", self.silent_frames)
+        return self.intervals(["lavfi.silence_start", "lavfi.silence_end"])
 
-    @property
+    @cached_property
     def split_points(self) -> list[SplitMetadata]:
-        cache_key = "split_points"
-        if cache_key not in self.cache:
-            split_points = []
-            _black_intervals = self.black_intervals[:]
-            _silent_intervals = self.silent_intervals[:]
+        split_points = []
+        black_intervals = self.black_intervals
+        silent_intervals = self.silent_intervals
+        debug = logging.getLogger().isEnabledFor(logging.DEBUG)
+        if debug:
             log_multiline(
                 logging.DEBUG,
                 f"black intervals:",
-                "\n".join(str(frame) for frame in _black_intervals),
+                "\n".join(str(frame) for frame in black_intervals),
             )
             log_multiline(
                 logging.DEBUG,
                 f"silent intervals:",
-                "\n".join(str(frame) for frame in _silent_intervals),
+                "\n".join(str(frame) for frame in silent_intervals),
             )
-            while _black_intervals:
-                black_interval = _black_intervals.pop(0)
-                for i, silent_interval in enumerate(_silent_intervals):
-                    if black_interval.overlaps(silent_interval):
-                        split_points.append(
-                            SplitMetadata(black_interval, silent_interval)
-                        )
-                        _silent_intervals.pop(i)
-                        break
+        black_index = silent_index = 0
+        while black_index < len(black_intervals) and silent_index < len(
+            silent_intervals
+        ):
+            black_interval = black_intervals[black_index]
+            silent_interval = silent_intervals[silent_index]
+            if black_interval.overlaps(silent_interval):
+                split_points.append(SplitMetadata(black_interval, silent_interval))
+                black_index += 1
+                silent_index += 1
+            elif black_interval.ends_before(silent_interval):
+                black_index += 1
+            else:
+                silent_index += 1
+        if debug:
             log_multiline(
                 logging.DEBUG,
                 "split_points:",
                 f"\n-----\n".join(sp.output() for sp in split_points),
             )
-            self.cache[cache_key] = split_points
-        return self.cache[cache_key]
-
-    def clip(
-        self, start: Optional[SplitMetadata], end: Optional[SplitMetadata]
-    ) -> Clip:
-        fps = self.video_fps
-        frame_start = start.frame(fps) if start else 0
-        clip_start = start.time() if start else Decimal(0)
-        frame_end = end.frame(fps) if end else self.video_frame_count
-        clip_end = end.time() if end else self.video_duration
-        return Clip(frame_start, frame_end, clip_start, clip_end)
+        return split_points
 
     def clips(self) -> list[Clip]:
         min_duration = 3
+        detected = self.split_points
+        duration = self.video_duration
+        fps = self.video_fps
         split_points = []
-        if self.split_points:
-            first = self.split_points[0]
+        if detected:
+            first = detected[0]
             clip_duration = first.time_start()
             if clip_duration >= min_duration:
                 logging.debug(
                     f"adding split point at the beginning of the video, duration={format_timestamp(clip_duration)}"
                 )
                 split_points.append(None)
-            split_points.extend(self.split_points)
-            last = self.split_points[-1]
-            clip_duration = self.video_duration - last.time_end()
+            split_points.extend(detected)
+            last = detected[-1]
+            clip_duration = duration - last.time_end()
             if clip_duration >= min_duration:
                 logging.debug(
                     f"adding split point at the end of the video, duration={format_timestamp(clip_duration)}"
@@ -343,82 +485,115 @@ class Media:
         if len(split_points) <= 1:
             logging.debug(f"clipping whole video")
             split_points = [None, None]
+        boundaries = [
+            (split_point.frame(fps), split_point.time()) if split_point else None
+            for split_point in split_points
+        ]
+        if boundaries[0] is None:
+            boundaries[0] = (0, Decimal(0))
+        if boundaries[-1] is None:
+            boundaries[-1] = (self.video_frame_count, duration)
         clips = []
-        for index in range(len(split_points) - 1):
-            start, end = split_points[index : index + 2]
-            clip = self.clip(start, end)
-            clips.append(clip)
+        for (frame_start, time_start), (frame_end, time_end) in zip(
+            boundaries, boundaries[1:]
+        ):
+            clips.append(Clip(frame_start, frame_end, time_start, time_end))
         return clips
 
     def _save_info(self, info: dict[str, Clip]):
         info_dict = {"media": os.path.basename(self.path)}
         for file, clip in info.items():
-            clip_info = dict()
-            clip_info["frame_start"] = clip.frame_start
-            clip_info["frame_end"] = clip.frame_end
-            clip_info["frames"] = clip.frames
-            clip_info["time_start"] = str(clip.time_start)
-            clip_info["time_end"] = str(clip.time_end)
-            clip_info["duration"] = str(clip.duration)
-            clip_info["formatted"] = {}
-            clip_info["formatted"]["time_start"] = format_timestamp(clip.time_start)
-            clip_info["formatted"]["time_end"] = format_timestamp(clip.time_end)
-            clip_info["formatted"]["duration"] = format_timestamp(clip.duration)
-            info_dict[file] = clip_info
-        with open(os.path.join(self.output_folder, "info.yaml"), "w") as fh:
-            yaml.dump(info_dict, fh, sort_keys=False)
-
-    def _split(self, args: list[str]):
+            info_dict[file] = clip.info
+        info_file = os.path.join(self.output_folder, "info.yaml")
+        with open(f"{info_file}.incomplete", "w") as fh:
+            yaml.dump(info_dict, fh, Dumper=SafeDumper, sort_keys=False)
+        os.replace(f"{info_file}.incomplete", info_file)
+
+    async def _split(self, args: list[str], position: int = 0):
         with tqdm(
             total=100,
             desc="Encoding",
             miniters=1,
             delay=1,
+            position=position,
+            disable=self.config.parallel_files > 1,
             bar_format="{l_bar}{bar:20}| [{elapsed}] ETA: {remaining}",
         ) as pbar:
             handler = partial(
-                monitor_handbrake_encode, progress_bar=pbar, data={"current_line": b""}
+                monitor_handbrake_encode,
+                progress_bar=pbar,
+                data={"current_line": bytearray()},
             )
-            cp: CompletedProcess = asyncio.run(
-                async_run_process(
-                    args,
-                    stdout_handler=handler,
-                    check=True,
-                    text=True,
-                )
+            cp: CompletedProcess = await async_run_process(
+                args,
+                stdout_handler=handler,
+                check=True,
+                discard_stdout=True,
+                text=True,
             )
             if cp.returncode == 0:
                 pbar.update(100 - pbar.n)
 
+    async def _encode_clips(self, encodes: list[tuple[str, list[str], str]]):
+        semaphore = asyncio.Semaphore(self.config.parallel_encodes)
+        positions = deque(range(self.config.parallel_encodes))
+
+        async def encode(message: str, args: list[str], clip_file: str):
+            async with semaphore:
+                logging.info(message)
+                if self.config.dry_run:
+                    logging.info("...dry run")
+                    return
+                position = positions.popleft()
+                try:
+                    await self._split(args, position)
+                finally:
+                    positions.append(position)
+                clip_path = os.path.join(self.output_folder, clip_file)
+                logging.debug(f"renaming {clip_file}.incomplete -> {clip_file}")
+                os.rename(f"{clip_path}.incomplete", clip_path)
+                logging.info(f"...{clip_file} done!")
+
+        await asyncio.gather(*(encode(*encode_args) for encode_args in encodes))
+
     def split(self):
         clips = self.clips()
         info: dict[str, Clip] = {}
+        encodes: list[tuple[str, list[str], str]] = []
+        handbrake_args = [
+            self.config.handbrake_cli,
+            "--preset-import-file",
+            self.config.handbrake_presets_import,
+            "--preset",
+            self.config.handbrake_preset,
+            "--no-markers",
+        ]
+        with os.scandir(self.output_folder) as it:
+            existing_files = {entry.name for entry in it}
         for clip_index, clip in enumerate(clips):
             clip_file = f"{clip_index:0>3}{self.extension}"
             clip_path = os.path.join(self.output_folder, clip_file)
-            incomplete_clip_path = f"{clip_path}.incomplete"
-            clip_index += 1
-            logging.info(
-                f"Encoding {clip.frames} frames ({clip.frame_start}-{clip.frame_end}) -> {clip_file} [{format_timestamp(clip.duration)}]"
+            incomplete_clip_file = f"{clip_file}.incomplete"
+            incomplete_clip_path = os.path.join(
+                self.output_folder, incomplete_clip_file
             )
+            clip_index += 1
+            message = f"Encoding {clip.frames} frames ({clip.frame_start}-{clip.frame_end}) -> {clip_file} [{clip.formatted_duration}]"
             info[clip_file] = clip
-            if os.path.exists(clip_path):
+            if clip_file in existing_files:
+                logging.info(message)
                 logging.warning(f"{clip_file} already exists. skipping...")
                 continue
-            if os.path.exists(incomplete_clip_path):
+            if incomplete_clip_file in existing_files:
                 logging.debug(f"removing incomplete: {incomplete_clip_path}")
                 os.remove(incomplete_clip_path)
             if len(clips) == 1:
+                logging.info(message)
                 logging.info(f"clip is whole file, creating link...")
                 os.link(self.path, clip_path)
                 continue
             args = [
-                self.config.handbrake_cli,
-                "--preset-import-file",
-                self.config.handbrake_presets_import,
-                "--preset",
-                self.config.handbrake_preset,
-                "--no-markers",
+                *handbrake_args,
                 "--start-at",
                 f"seconds:{clip.time_start}",
                 "--stop-at",
@@ -428,13 +603,7 @@ class Media:
                 "-o",
                 incomplete_clip_path,
             ]
-            if self.config.dry_run:
-                logging.info("...dry run")
-            else:
-                self._split(args)
-                logging.debug(
-                    f"renaming {os.path.basename(incomplete_clip_path)} -> {clip_file}"
-                )
-                os.rename(incomplete_clip_path, clip_path)
-                logging.info("...done!")
+            encodes.append((message, args, clip_file))
+        if encodes:
+            asyncio.run(self._encode_clips(encodes))
         self._save_info(info)
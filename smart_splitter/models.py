@@ -1,22 +1,34 @@
 from dataclasses import dataclass
+from functools import cached_property
 from decimal import Decimal
 from typing import Optional, Union
 
-from core.utils import format_timestamp, fps_adjusted_frame
+from core.utils import format_timestamp, fps_adjusted_frame, timestamp_ns
 
 
 @dataclass
 class FrameMetadata:
+    __slots__ = ("raw", "filter", "type", "sub_type", "value", "key")
     raw: str
     filter: str
     type: str
     sub_type: Optional[str]
     value: str
 
-    @property
-    def key(self):
+    @classmethod
+    def from_key(cls, raw: str, key: str, value: str) -> "FrameMetadata":
+        # key is in the form [filter.]type[_sub_type], ex: lavfi.black_start
+        metadata_filter, _, metadata_type = key.partition(".")
+        if not metadata_type:
+            metadata_filter, metadata_type = None, key
+        type_prefix, _, sub_type = metadata_type.rpartition("_")
+        if type_prefix and sub_type:
+            return cls(raw, metadata_filter, type_prefix, sub_type, value)
+        return cls(raw, metadata_filter, metadata_type, None, value)
+
+    def __post_init__(self):
         sub_type = f"_{self.sub_type}" if self.sub_type else ""
-        return f"{self.filter}.{self.type}{sub_type}"
+        self.key = f"{self.filter}.{self.type}{sub_type}"
 
     def __str__(self):
         return f"{self.key}={self.value}"
@@ -27,11 +39,12 @@ class FrameMetadata:
 
 @dataclass
 class FrameInfo:
+    __slots__ = ("raw", "frame", "pts", "pts_time", "metadata")
     raw: str
     frame: int
     pts: int
     pts_time: Decimal
-    metadata: dict[str, FrameMetadata]
+    metadata: list[FrameMetadata]
 
     def __init__(
         self,
@@ -44,7 +57,7 @@ class FrameInfo:
         self.frame = frame if isinstance(frame, int) else int(frame)
         self.pts = pts if isinstance(pts, int) else int(pts)
         self.pts_time = pts_time if isinstance(pts_time, Decimal) else Decimal(pts_time)
-        self.metadata = {}
+        self.metadata = []
 
     def __str__(self):
         return f"frame: {self.frame} pts: {self.pts} pts_time: {self.pts_time}"
@@ -61,6 +74,7 @@ class DetectMetadata:
     pts: int
     pts_time: Decimal
     timestamp: Decimal
+    timestamp_ns: int
 
     def __init__(self, frame_info: FrameInfo, frame_metadata: FrameMetadata):
         self.type = frame_metadata.type
@@ -69,22 +83,27 @@ class DetectMetadata:
         self.pts = frame_info.pts
         self.pts_time = frame_info.pts_time
         self.timestamp = Decimal(frame_metadata.value)
+        self.timestamp_ns = timestamp_ns(self.timestamp)
 
-    @property
+    @cached_property
     def short_type(self) -> str:
         return "B" if self.type == "black" else "S"
 
-    @property
-    def fps(self) -> Decimal:
+    @cached_property
+    def fps(self) -> float:
         if self.pts_time.is_zero():
-            return Decimal("-1")
-        return self.frame / self.pts_time
+            return -1.0
+        return self.frame / float(self.pts_time)
+
+    @cached_property
+    def formatted_timestamp(self) -> str:
+        return format_timestamp(self.timestamp)
 
     def output(self, include_type: bool = True, include_frame: bool = True) -> str:
         sub_type = f"-{self.sub_type.upper()}" if self.sub_type else ""
         type_part = f"[{self.short_type}{sub_type}] " if include_type else ""
         frame_part = f" ({self.frame})" if include_frame else ""
-        return f"{type_part}{format_timestamp(self.timestamp)}{frame_part}"
+        return f"{type_part}{self.formatted_timestamp}{frame_part}"
 
     def __str__(self):
         return self.output()
@@ -98,34 +117,37 @@ class DetectInterval:
     start: DetectMetadata
     end: DetectMetadata
 
-    def overlaps(self, other: "DetectInterval", tolerance: Decimal = Decimal("0.5")):
-        st, et = self.start.timestamp, self.end.timestamp
-        other_st, other_et = other.start.timestamp, other.end.timestamp
+    def overlaps(self, other: "DetectInterval", tolerance_ns: int = 500_000_000):
+        st, et = self.start.timestamp_ns, self.end.timestamp_ns
+        other_st, other_et = other.start.timestamp_ns, other.end.timestamp_ns
         if st >= other_st and et <= other_et:
             return True
         if st > other_et or et < other_st:
             return False
-        if abs(st - other_st) <= tolerance or abs(et - other_et) <= tolerance:
+        if abs(st - other_st) <= tolerance_ns or abs(et - other_et) <= tolerance_ns:
             return True
         return False
 
-    @property
+    def ends_before(self, other: "DetectInterval") -> bool:
+        return self.end.timestamp_ns <= other.end.timestamp_ns
+
+    @cached_property
     def type(self) -> str:
         interval_type = self.start.short_type
         if interval_type != self.end.short_type:
             interval_type += self.end.short_type
         return interval_type
 
-    @property
+    @cached_property
     def timestamp_range(self) -> str:
         return f"{self.start.output(False, False)} - {self.end.output(False, False)}"
 
-    @property
+    @cached_property
     def frames(self):
         return f"{self.start.frame}-{self.end.frame}"
 
-    @property
-    def fps(self) -> Decimal:
+    @cached_property
+    def fps(self) -> float:
         return (self.start.fps + self.end.fps) / 2
 
     @property
@@ -149,13 +171,13 @@ class SplitMetadata:
     black_frame: DetectInterval
     silent_frame: DetectInterval
 
-    def frame_start(self, video_fps: Decimal) -> int:
+    def frame_start(self, video_fps: float) -> int:
         return fps_adjusted_frame(self.silent_frame.start.timestamp, video_fps)
 
-    def frame_end(self, video_fps: Decimal) -> int:
+    def frame_end(self, video_fps: float) -> int:
         return fps_adjusted_frame(self.black_frame.end.timestamp, video_fps)
 
-    def frame(self, video_fps: Decimal) -> int:
+    def frame(self, video_fps: float) -> int:
         start_frame = self.frame_start(video_fps)
         end_frame = self.frame_end(video_fps)
         return int((start_frame + end_frame) / 2)
@@ -169,7 +191,7 @@ class SplitMetadata:
     def time(self) -> Decimal:
         return (self.time_start() + self.time_end()) / 2
 
-    def output(self, video_fps: Optional[Decimal] = None, prefix=""):
+    def output(self, video_fps: Optional[float] = None, prefix=""):
         video_fps = video_fps or self.black_frame.fps
         start_frame = self.frame_start(video_fps)
         end_frame = self.frame_end(video_fps)
@@ -186,13 +208,41 @@ class Clip:
     time_start: Decimal
     time_end: Decimal
 
-    @property
+    @cached_property
     def frames(self):
         return self.frame_end - self.frame_start
 
-    @property
+    @cached_property
     def duration(self):
         return self.time_end - self.time_start
 
+    @cached_property
+    def formatted_time_start(self) -> str:
+        return format_timestamp(self.time_start)
+
+    @cached_property
+    def formatted_time_end(self) -> str:
+        return format_timestamp(self.time_end)
+
+    @cached_property
+    def formatted_duration(self) -> str:
+        return format_timestamp(self.duration)
+
+    @cached_property
+    def info(self) -> dict:
+        return {
+            "frame_start": self.frame_start,
+            "frame_end": self.frame_end,
+            "frames": self.frames,
+            "time_start": str(self.time_start),
+            "time_end": str(self.time_end),
+            "duration": str(self.duration),
+            "formatted": {
+                "time_start": self.formatted_time_start,
+                "time_end": self.formatted_time_end,
+                "duration": self.formatted_duration,
+            },
+        }
+
     def __str__(self):
-        return f"{self.frame_start}-{self.frame_end} ({self.frames}) [{format_timestamp(self.duration)}]"
+        return f"{self.frame_start}-{self.frame_end} ({self.frames}) [{self.formatted_duration}]"
@@ -1,16 +1,28 @@
+import argparse
 import logging
+import multiprocessing
 import os
 import re
+from concurrent.futures import ProcessPoolExecutor
 from functools import partial
+from logging.handlers import QueueListener
 from typing import Optional
 
 import yaml
 
+from core.config import SafeLoader
 from core.tool import Tool
 from smart_splitter.media import Media
 from decimal import Decimal
 from smart_splitter.config import SmartSplitterConfig
-from core.utils import validate_paths, log_file_header
+from core.utils import validate_paths, log_file_header, initialize_worker_logger
+
+
+def positive_int(value: str) -> int:
+    int_value = int(value)
+    if int_value < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1: {value}")
+    return int_value
 
 
 class SmartSplitter(Tool):
@@ -51,7 +63,7 @@ class SmartSplitter(Tool):
         info_file = os.path.join(output_path, "info.yaml")
         if os.path.exists(info_file):
             with open(info_file) as fh:
-                info = yaml.safe_load(fh)
+                info = yaml.load(fh, Loader=SafeLoader)
                 if "media" not in info:
                     raise KeyError(f"info.yaml file is missing the media key")
                 file_media_id = info["media"]
@@ -60,7 +72,9 @@ class SmartSplitter(Tool):
                     f"'{output_path}' contains output for '{file_media_id}'"
                 )
         else:
-            if os.listdir(output_path):
+            with os.scandir(output_path) as it:
+                has_files = next(it, None) is not None
+            if has_files:
                 logging.warning(
                     f"{output_path} missing info.yaml file, but contains files."
                 )
@@ -79,25 +93,49 @@ class SmartSplitter(Tool):
         )
         media.split()
 
+    def split_file(self, media_file: str):
+        old_handlers = logging.getLogger().handlers[:]
+        try:
+            self.split_media(media_file)
+        except Exception as exc:
+            # catch errors here, so we can continue with the remaining files
+            if isinstance(Exception, FileNotFoundError):
+                logging.error(f"File not found: {exc}")
+            else:
+                logging.error(exc)
+            logging.error(f"!! An error was detected. Aborting...")
+            logging.exception(exc)
+        finally:
+            remove_handlers = [
+                h for h in logging.getLogger().handlers if h not in old_handlers
+            ]
+            for handler in remove_handlers:
+                logging.getLogger().removeHandler(handler)
+                handler.close()
+
     def split_files(self, media_files: list[str]):
-        for media_file in media_files:
-            old_handlers = logging.getLogger().handlers[:]
-            try:
-                self.split_media(media_file)
-            except Exception as exc:
-                # catch errors here, so we can continue with the remaining files
-                if isinstance(Exception, FileNotFoundError):
-                    logging.error(f"File not found: {exc}")
-                else:
-                    logging.error(exc)
-                logging.error(f"!! An error was detected. Aborting...")
-                logging.exception(exc)
-            finally:
-                remove_handlers = [
-                    h for h in logging.getLogger().handlers if h not in old_handlers
-                ]
-                for handler in remove_handlers:
-                    logging.getLogger().removeHandler(handler)
+        max_workers = min(self.config.parallel_files, len(media_files))
+        if max_workers <= 1:
+            for media_file in media_files:
+                self.split_file(media_file)
+            return
+        mp_context = multiprocessing.get_context("spawn")
+        log_queue = mp_context.Queue()
+        listener = QueueListener(
+            log_queue, *logging.getLogger().handlers, respect_handler_level=True
+        )
+        listener.start()
+        try:
+            with ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=mp_context,
+                initializer=initialize_worker_logger,
+                initargs=(log_queue,),
+            ) as executor:
+                for _ in executor.map(self.split_file, media_files):
+                    pass
+        finally:
+            listener.stop()
 
     def validate(self):
         validate_paths(
@@ -106,17 +144,18 @@ class SmartSplitter(Tool):
             self.config.handbrake_cli,
             self.config.handbrake_presets_import,
         )
+        preset = self.config.handbrake_preset
         with open(self.config.handbrake_presets_import) as fh:
-            if self.config.handbrake_preset not in fh.read():
-                raise ValueError(
-                    f"handbrake preset not found: {self.config.handbrake_preset}"
-                )
+            if not any(preset in line for line in fh):
+                raise ValueError(f"handbrake preset not found: {preset}")
+        for name in ["parallel_files", "parallel_encodes"]:
+            value = getattr(self.config, name)
+            if value < 1:
+                raise ValueError(f"{name} must be at least 1: {value}")
 
     @staticmethod
-    def create_parser(subparsers):
-        parser = subparsers.add_parser(
-            "split", description="split media files at black/silent frames"
-        )
+    def add_arguments(parser: argparse.ArgumentParser):
+        parser.description = "split media files at black/silent frames"
         parser.add_argument(
             "--black-min-duration",
             type=Decimal,
@@ -151,3 +190,15 @@ class SmartSplitter(Tool):
             type=partial(re.compile, flags=re.IGNORECASE),
             help="regex used on the input file(s) to determine output directory relative to --output-directory (defaults to basename without extension)",
         )
+        parser.add_argument(
+            "--parallel-files",
+            type=positive_int,
+            default=argparse.SUPPRESS,
+            help="number of media files to split concurrently, each running its own HandBrake encode (default: 1)",
+        )
+        parser.add_argument(
+            "--parallel-encodes",
+            type=positive_int,
+            default=argparse.SUPPRESS,
+            help="number of clips from the same media file to encode concurrently (default: 1)",
+        )
@@ -1,3 +1,4 @@
+import argparse
 import itertools
 import logging
 import os
@@ -228,10 +229,8 @@ class StreamPruner(Tool):
                 logging.exception(exc)
 
     @staticmethod
-    def create_parser(subparsers):
-        parser = subparsers.add_parser(
-            "prune", description="prunes and reorders tracks from media"
-        )
+    def add_arguments(parser: argparse.ArgumentParser):
+        parser.description = "prunes and reorders tracks from media"
         parser.add_argument(
             "--input",
             "-i",